@@ -1,20 +1,102 @@
-from flask import Flask, request, jsonify, send_file
-import yt_dlp
 import os
+
+# gunicorn's gevent worker patches on its own; set GEVENT_PATCH=1 to get the
+# same cooperative I/O when running app.py directly
+if os.environ.get('GEVENT_PATCH') == '1':
+    from gevent import monkey
+    monkey.patch_all()
+
+from flask import Flask, Response, request, jsonify, send_from_directory
+from flask.json.provider import DefaultJSONProvider
+import orjson
+import yt_dlp
+from yt_dlp.networking import Request
+import mimetypes
+import unicodedata
+from urllib.parse import quote
 import threading
 import time
-import uuid
+import secrets
 import shutil
+import queue
+import heapq
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from itertools import islice
+from collections import OrderedDict
 from datetime import datetime, timedelta
 import json
+import re
+from cachetools import TTLCache
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Serialize jsonify responses with orjson instead of the stdlib encoder"""
+    
+    def dumps(self, obj, **kwargs):
+        option = orjson.OPT_NON_STR_KEYS
+        if kwargs.get('sort_keys', self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get('indent'):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=self.default, option=option).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
 
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
+# Only enable behind a proxy that honours X-Sendfile (nginx, apache), which
+# then sends the file with sendfile(2) instead of the worker copying it
+app.config['USE_X_SENDFILE'] = os.environ.get('USE_X_SENDFILE') == '1'
 
 # Configuration
 DOWNLOAD_DIR = './downloads'
 COOKIE_FILE = './cookies.txt'
 CLEANUP_INTERVAL = 60  # 1 minute
 FILE_EXPIRY_TIME = 300  # 5 minutes
+DOWNLOAD_WORKERS = 4  # async downloads running at once
+MAX_ACTIVE_DOWNLOADS = 16  # queued plus running before /download answers 503
+MAX_TRACKED_DOWNLOADS = 10000  # download records kept in memory
+ACTIVE_STATUSES = ('queued', 'downloading')  # records that are never expired
+INFO_CACHE_SIZE = 4096  # videos whose /info response is memoized
+INFO_CACHE_TTL = 600  # 10 minutes
+DESCRIPTION_LIMIT = 500  # characters of description returned by /info
+
+STREAM_CHUNK_SIZE = 64 * 1024  # bytes read from YouTube per streamed chunk
+# YouTube throttles single large range requests; fetch in 10 MiB ranges instead
+HTTP_CHUNK_SIZE = 10 * 1024 * 1024
+YDL_POOL_SIZE = 4  # idle YoutubeDL instances kept per (quality, format)
+YDL_POOL_MAX_KEYS = 32  # distinct (quality, format) pools kept alive
+
+# YouTube video URLs accepted by /info and /download; group 1 is the video ID
+URL_PATTERN = re.compile(
+    r'^https?://(?:www\.|m\.|music\.)?'
+    r'(?:youtube\.com/(?:watch\?(?:[^#]*&)?v=|shorts/|embed/|live/)|youtu\.be/)'
+    r'([A-Za-z0-9_-]{11})(?![A-Za-z0-9_-])'
+)
+
+# Anything other than letters, digits, spaces, '-' and '_' is dropped from
+# titles used as filenames
+UNSAFE_FILENAME_CHARS = re.compile(r'[^\w -]+')
+
+# Latest Chrome headers for 2025 to avoid bot detection
+HTTP_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/127.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
+    'Accept-Language': 'en-US,en;q=0.9',
+    'Accept-Encoding': 'gzip, deflate, br, zstd',
+    'DNT': '1',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1',
+    'Sec-Fetch-Dest': 'document',
+    'Sec-Fetch-Mode': 'navigate',
+    'Sec-Fetch-Site': 'none',
+    'Sec-Fetch-User': '?1',
+    'Sec-CH-UA': '"Not)A;Brand";v="99", "Google Chrome";v="127", "Chromium";v="127"',
+    'Sec-CH-UA-Mobile': '?0',
+    'Sec-CH-UA-Platform': '"Windows"',
+    'Cache-Control': 'max-age=0',
+}
 
 # Create downloads directory
 os.makedirs(DOWNLOAD_DIR, exist_ok=True)
@@ -42,121 +124,397 @@ def initialize_cookies():
 # Initialize cookies on startup
 cookie_status = initialize_cookies()
 
-# Store for tracking downloads
-downloads = {}
+# Store for tracking downloads, oldest 'timestamp' first so expiry can stop
+# at the first live record; only touch it while holding downloads_lock
+downloads = OrderedDict()
+downloads_lock = threading.Lock()
+# Records in ACTIVE_STATUSES, which are never expired; guarded by downloads_lock
+active_downloads = 0
+
+# Runs async downloads so /download returns as soon as one is queued
+executor = ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS)
+
+# /info responses keyed by video ID
+info_cache = TTLCache(maxsize=INFO_CACHE_SIZE, ttl=INFO_CACHE_TTL)
+info_cache_lock = threading.Lock()
+
+# Pending expiries as (expiry_ts, download_id, filepath), soonest first
+expiry_heap = []
+expiry_cond = threading.Condition()
+
+# Pooled YoutubeDL instances, keyed by (quality, format_type). Each queue holds
+# (cookie_version, instance) pairs; instances built before the last cookie
+# update are discarded on checkout so they never use a stale cookie jar.
+# Otherwise instances live for the whole process: each keeps its HTTP
+# connection pool, so repeat extractions skip the TCP and TLS handshakes.
+ydl_pool = {}
+ydl_pool_lock = threading.Lock()
+cookie_version = 0
+# Held while cookies.txt is rewritten and while an instance is closed, since
+# close() writes its jar back to the same file
+cookie_lock = threading.Lock()
+# Whether COOKIE_FILE holds cookies; checked on startup and kept current by
+# parse_cookie_txt so building options never has to stat the file
+cookies_available = cookie_status
 
 def parse_cookie_txt(cookie_content):
     """Parse cookie.txt content and create a proper cookie file"""
+    global cookie_version, cookies_available
     try:
-        # Write the cookie content to a file that yt-dlp can use
-        with open(COOKIE_FILE, 'w', encoding='utf-8') as f:
-            f.write(cookie_content)
+        with cookie_lock:
+            # Write the cookie content to a file that yt-dlp can use
+            with open(COOKIE_FILE, 'w', encoding='utf-8') as f:
+                f.write(cookie_content)
+            # Pooled instances loaded the old jar; have them rebuilt
+            cookie_version += 1
+            cookies_available = bool(cookie_content.strip())
         return True
     except Exception as e:
         print(f"Error parsing cookies: {e}")
         return False
 
-def get_yt_dlp_options(quality='best', format_type='mp4'):
-    """Get yt-dlp options with latest anti-bot detection and cookie support"""
+def progress_hook(d):
+    """Record progress on the download it belongs to"""
+    # download_id is passed to extract_info as extra_info, so it rides along
+    # in info_dict and pooled instances need no per-request hook
+    download_id = d.get('info_dict', {}).get('download_id')
+    if download_id is None:
+        return
     
-    # Latest Chrome headers for 2025 to avoid bot detection
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/127.0.0.0 Safari/537.36',
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
-        'Accept-Language': 'en-US,en;q=0.9',
-        'Accept-Encoding': 'gzip, deflate, br, zstd',
-        'DNT': '1',
-        'Connection': 'keep-alive',
-        'Upgrade-Insecure-Requests': '1',
-        'Sec-Fetch-Dest': 'document',
-        'Sec-Fetch-Mode': 'navigate',
-        'Sec-Fetch-Site': 'none',
-        'Sec-Fetch-User': '?1',
-        'Sec-CH-UA': '"Not)A;Brand";v="99", "Google Chrome";v="127", "Chromium";v="127"',
-        'Sec-CH-UA-Mobile': '?0',
-        'Sec-CH-UA-Platform': '"Windows"',
-        'Cache-Control': 'max-age=0',
-    }
+    # Merged formats download one stream after another, each with its own
+    # byte count, so only a single-format download has a meaningful ratio.
+    # Completion (progress 1.0) is recorded by run_download, not per stream.
+    if d['status'] != 'downloading' or not d['info_dict'].get('single_format'):
+        return
     
+    total = d.get('total_bytes') or d.get('total_bytes_estimate')
+    if not total:
+        return
+    with downloads_lock:
+        if download_id in downloads:
+            downloads[download_id]['progress'] = min(d.get('downloaded_bytes', 0) / total, 1.0)
+
+def retry_sleep(n):
+    """Exponential backoff for yt-dlp retries, capped at a minute"""
+    return min(4 ** n, 60)
+
+# Options shared by every YoutubeDL instance; built once at import and never
+# mutated, get_yt_dlp_options only overlays the per-request keys
+BASE_OPTS = {
+    'outtmpl': os.path.join(DOWNLOAD_DIR, '%(title)s.%(ext)s'),
+    'quiet': True,
+    'noplaylist': True,
+    'no_warnings': False,
+    'ignoreerrors': False,
+    'writesubtitles': False,
+    'writeautomaticsub': False,
+    'http_headers': HTTP_HEADERS,
+    # Fail a stalled connection instead of pinning a pooled instance
+    'socket_timeout': 10,
+    'sleep_interval': 1,
+    'max_sleep_interval': 5,
+    'sleep_interval_subtitles': 1,
+    'extractor_retries': 5,
+    'file_access_retries': 5,
+    'fragment_retries': 15,
+    # Range size and parallel fragments are tuned for YouTube's throttling
+    'http_chunk_size': HTTP_CHUNK_SIZE,
+    'concurrent_fragment_downloads': 4,
+    'retry_sleep_functions': {
+        'http': retry_sleep,
+        'fragment': retry_sleep,
+        'file_access': retry_sleep,
+        'extractor': retry_sleep
+    },
+    # Enhanced options for latest yt-dlp
+    'extractor_args': {
+        'youtube': {
+            'player_client': ['android', 'web'],
+            'player_skip': ['webpage'],
+            'comment_sort': ['top'],
+            'max_comments': ['0']
+        }
+    },
+    # Additional anti-bot measures
+    'geo_bypass': True,
+    'geo_verification_proxy': None,
+    # Use latest available extractors
+    'prefer_free_formats': False,
+    'youtube_include_dash_manifest': True,
+    'extract_flat': False,
+    'progress_hooks': [progress_hook]
+}
+
+def get_yt_dlp_options(quality='best', format_type='mp4'):
+    """Get yt-dlp options with latest anti-bot detection and cookie support"""
     options = {
-        'outtmpl': os.path.join(DOWNLOAD_DIR, '%(title)s.%(ext)s'),
-        'format': f'{quality}[ext={format_type}]/best[ext={format_type}]/best',
-        'noplaylist': True,
-        'no_warnings': False,
-        'ignoreerrors': False,
-        'writesubtitles': False,
-        'writeautomaticsub': False,
-        'http_headers': headers,
-        'sleep_interval': 1,
-        'max_sleep_interval': 5,
-        'sleep_interval_subtitles': 1,
-        'extractor_retries': 5,
-        'file_access_retries': 5,
-        'fragment_retries': 15,
-        'retry_sleep_functions': {
-            'http': lambda n: min(4 ** n, 60),
-            'fragment': lambda n: min(4 ** n, 60),
-            'file_access': lambda n: min(4 ** n, 60),
-            'extractor': lambda n: min(4 ** n, 60)
-        },
-        # Enhanced options for latest yt-dlp
-        'extractor_args': {
-            'youtube': {
-                'player_client': ['android', 'web'],
-                'player_skip': ['webpage'],
-                'comment_sort': ['top'],
-                'max_comments': ['0']
-            }
-        },
-        # Additional anti-bot measures
-        'geo_bypass': True,
-        'geo_verification_proxy': None,
-        # Use latest available extractors
-        'prefer_free_formats': False,
-        'youtube_include_dash_manifest': True,
-        'extract_flat': False
+        **BASE_OPTS,
+        'format': f'{quality}[ext={format_type}]/best[ext={format_type}]/best'
     }
     
-    # Add cookie file if it exists
-    if os.path.exists(COOKIE_FILE):
+    # Add cookie file if one has been provided
+    if cookies_available:
         options['cookiefile'] = COOKIE_FILE
     
     return options
 
-def cleanup_files():
-    """Clean up old files periodically"""
-    while True:
+def close_ydl(ydl, version):
+    """Close a YoutubeDL instance, skipping the cookie write-back if stale"""
+    with cookie_lock:
+        if version != cookie_version:
+            # close() saves the in-memory jar, which would clobber new cookies
+            ydl.params.pop('cookiefile', None)
+        ydl.close()
+
+@contextmanager
+def checkout(quality='best', format_type='mp4'):
+    """Borrow a long-lived YoutubeDL instance for the given quality and format"""
+    key = (quality, format_type)
+    with ydl_pool_lock:
+        pool = ydl_pool.get(key)
+        if pool is None and len(ydl_pool) < YDL_POOL_MAX_KEYS:
+            pool = ydl_pool[key] = queue.Queue(maxsize=YDL_POOL_SIZE)
+    
+    ydl = None
+    if pool is not None:
+        while ydl is None:
+            try:
+                version, ydl = pool.get_nowait()
+            except queue.Empty:
+                break
+            if version != cookie_version:
+                close_ydl(ydl, version)
+                ydl = None
+    
+    if ydl is None:
+        version = cookie_version
+        ydl = yt_dlp.YoutubeDL(get_yt_dlp_options(quality, format_type))
+    
+    try:
+        yield ydl
+    finally:
+        if pool is None or version != cookie_version:
+            close_ydl(ydl, version)
+        else:
+            try:
+                pool.put_nowait((version, ydl))
+            except queue.Full:
+                close_ydl(ydl, version)
+
+def safe_filename(title):
+    """Strip a video title down to characters safe to use as a filename"""
+    return UNSAFE_FILENAME_CHARS.sub('', title).rstrip() or 'video'
+
+def truncate_description(description):
+    """Shorten a description to DESCRIPTION_LIMIT characters for /info"""
+    if not description:
+        return ''
+    if len(description) <= DESCRIPTION_LIMIT:
+        return description
+    return description[:DESCRIPTION_LIMIT] + '...'
+
+def content_disposition(filename):
+    """Build an attachment Content-Disposition header safe for non-ASCII names"""
+    try:
+        filename.encode('ascii')
+        return f'attachment; filename="{filename}"'
+    except UnicodeEncodeError:
+        simple = unicodedata.normalize('NFKD', filename).encode('ascii', 'ignore').decode('ascii')
+        return f'attachment; filename="{simple}"; filename*=UTF-8\'\'{quote(filename)}'
+
+def open_range(ydl, info, start):
+    """Request the next HTTP_CHUNK_SIZE bytes of a format, starting at start"""
+    headers = dict(info.get('http_headers') or {})
+    headers['Range'] = f'bytes={start}-{start + HTTP_CHUNK_SIZE - 1}'
+    return ydl.urlopen(Request(info['url'], headers=headers))
+
+def stream_video(url, quality, format_type):
+    """Pipe the selected format from YouTube straight to the client"""
+    try:
+        with checkout(quality, format_type) as ydl:
+            info = ydl.extract_info(url, download=False)
+            # Only single-file HTTP formats can be relayed byte for byte
+            if not info.get('url') or not info.get('protocol', '').startswith('http'):
+                return jsonify({'error': 'Selected format cannot be streamed, retry with async=1'}), 400
+            upstream = open_range(ydl, info, 0)
+    except Exception as e:
+        return jsonify({'error': f'Download failed: {str(e)}'}), 500
+    
+    # Content-Range is "bytes 0-N/total"; without it the server ignored the
+    # range and the first response already carries the whole file
+    content_range = upstream.headers.get('Content-Range', '')
+    total = int(content_range.rsplit('/', 1)[1]) if content_range[-1:].isdigit() else None
+    
+    def generate():
+        current, position = upstream, 0
         try:
-            current_time = datetime.now()
-            files_to_remove = []
-            
-            for filename in os.listdir(DOWNLOAD_DIR):
-                filepath = os.path.join(DOWNLOAD_DIR, filename)
-                if os.path.isfile(filepath):
-                    file_time = datetime.fromtimestamp(os.path.getctime(filepath))
-                    if current_time - file_time > timedelta(seconds=FILE_EXPIRY_TIME):
-                        files_to_remove.append(filepath)
-            
-            for filepath in files_to_remove:
-                try:
-                    os.remove(filepath)
-                    print(f"Cleaned up: {filepath}")
-                except Exception as e:
-                    print(f"Error cleaning up {filepath}: {e}")
+            while True:
+                while True:
+                    chunk = current.read(STREAM_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    position += len(chunk)
+                    yield chunk
+                current.close()
+                if total is None or position >= total:
+                    break
+                with checkout(quality, format_type) as ydl:
+                    current = open_range(ydl, info, position)
+        finally:
+            current.close()
+    
+    title = info.get('title', 'video')
+    safe_title = safe_filename(title)
+    ext = info.get('ext', format_type)
+    
+    response = Response(generate(), mimetype=mimetypes.guess_type(f'video.{ext}')[0] or 'application/octet-stream')
+    response.headers['Content-Disposition'] = content_disposition(f'{safe_title}.{ext}')
+    content_length = total if total is not None else upstream.headers.get('Content-Length')
+    if content_length:
+        response.headers['Content-Length'] = str(content_length)
+    return response
+
+def track_download(download_id, record):
+    """Stamp a record and make it the newest download; hold downloads_lock"""
+    record['timestamp'] = datetime.now()
+    downloads[download_id] = record
+    downloads.move_to_end(download_id)
+    
+    excess = len(downloads) - MAX_TRACKED_DOWNLOADS
+    if excess > 0:
+        # Evict the oldest finished records; running ones must stay visible
+        finished = (key for key, info in downloads.items() if info['status'] not in ACTIVE_STATUSES)
+        for key in list(islice(finished, excess)):
+            del downloads[key]
+
+def finish_download(download_id, record):
+    """Re-track a record that just left ACTIVE_STATUSES; hold downloads_lock"""
+    global active_downloads
+    active_downloads -= 1
+    track_download(download_id, record)
+
+def expire_downloads():
+    """Drop finished download records older than FILE_EXPIRY_TIME"""
+    cutoff = datetime.now() - timedelta(seconds=FILE_EXPIRY_TIME)
+    with downloads_lock:
+        while downloads:
+            download_id = next(iter(downloads))
+            record = downloads[download_id]
+            if record['timestamp'] >= cutoff:
+                break
+            if record['status'] in ACTIVE_STATUSES:
+                # Still queued or running: re-stamp it rather than losing it
+                track_download(download_id, record)
+            else:
+                downloads.popitem(last=False)
+
+def schedule_expiry(download_id, filepath):
+    """Queue a downloaded file for removal once it expires"""
+    with expiry_cond:
+        heapq.heappush(expiry_heap, (time.time() + FILE_EXPIRY_TIME, download_id, filepath))
+        expiry_cond.notify()
+
+def remove_file(filepath):
+    """Delete a downloaded file, ignoring ones already gone"""
+    try:
+        os.remove(filepath)
+        print(f"Cleaned up: {filepath}")
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"Error cleaning up {filepath}: {e}")
+
+def run_download(download_id, record, quality, format_type):
+    """Download a video in the background, updating its tracking record"""
+    with downloads_lock:
+        record['status'] = 'downloading'
+    
+    try:
+        # Extract and download in one pass
+        with checkout(quality, format_type) as ydl:
+            # A '+' in quality asks yt-dlp to merge several streams
+            extra_info = {'download_id': download_id, 'single_format': '+' not in quality}
+            info = ydl.extract_info(record['url'], download=True, extra_info=extra_info)
+        title = info.get('title', 'video')
+        # Final path after any merging, also set when the file already existed
+        requested = info.get('requested_downloads') or [{}]
+        filepath = requested[0].get('filepath')
+        
+        # Sanitize filename
+        safe_title = safe_filename(title)
+        filesize = os.path.getsize(filepath) if filepath else None
+        
+        with downloads_lock:
+            record['title'] = title
+            downloaded_file = os.path.basename(filepath) if filepath else None
+            if downloaded_file:
+                record['status'] = 'completed'
+                # An already-downloaded file never fires the progress hook
+                record['progress'] = 1.0
+                record['filename'] = downloaded_file
+                # Lets clients plan parallel Range requests against /file
+                record['filesize'] = filesize
+                # Name the client sees, worked out once instead of on every /file hit
+                record['download_name'] = safe_title + os.path.splitext(downloaded_file)[1]
+            else:
+                record['status'] = 'error'
+                record['error'] = 'Downloaded file not found'
+            # Expire the record from completion, like the file
+            finish_download(download_id, record)
+        
+        if downloaded_file:
+            schedule_expiry(download_id, os.path.join(DOWNLOAD_DIR, downloaded_file))
             
-            # Clean up downloads tracking
-            expired_downloads = []
-            for download_id, info in downloads.items():
-                if current_time - info['timestamp'] > timedelta(seconds=FILE_EXPIRY_TIME):
-                    expired_downloads.append(download_id)
+    except Exception as e:
+        with downloads_lock:
+            record['status'] = 'error'
+            record['error'] = f'Download failed: {str(e)}'
+            finish_download(download_id, record)
+
+def sweep_stale_files():
+    """Remove expired files that were never scheduled, e.g. partial downloads"""
+    cutoff_ts = time.time() - FILE_EXPIRY_TIME
+    files_to_remove = []
+    
+    # DirEntry caches its stat result, so each file costs one syscall
+    with os.scandir(DOWNLOAD_DIR) as entries:
+        for entry in entries:
+            if entry.is_file() and entry.stat().st_ctime < cutoff_ts:
+                files_to_remove.append(entry.path)
+    
+    for filepath in files_to_remove:
+        remove_file(filepath)
+
+def cleanup_files():
+    """Remove downloads as they expire, sleeping until the next one is due"""
+    last_sweep = 0
+    while True:
+        # Failed downloads leave .part files and fragments that never reach
+        # the heap, as do files from a previous run; sweep for them too
+        if time.time() - last_sweep >= CLEANUP_INTERVAL:
+            last_sweep = time.time()
+            try:
+                sweep_stale_files()
+            except Exception as e:
+                print(f"Error in cleanup: {e}")
+        
+        with expiry_cond:
+            # Wake for the next file, or every CLEANUP_INTERVAL for the sweep
+            timeout = last_sweep + CLEANUP_INTERVAL - time.time()
+            if expiry_heap:
+                timeout = min(expiry_heap[0][0] - time.time(), timeout)
+            if timeout > 0:
+                expiry_cond.wait(timeout=timeout)
             
-            for download_id in expired_downloads:
-                downloads.pop(download_id, None)
-                
-        except Exception as e:
-            print(f"Error in cleanup: {e}")
+            now = time.time()
+            expired = []
+            while expiry_heap and expiry_heap[0][0] <= now:
+                expired.append(heapq.heappop(expiry_heap))
         
-        time.sleep(CLEANUP_INTERVAL)
+        for _, _, filepath in expired:
+            remove_file(filepath)
+        
+        expire_downloads()
 
 # Start cleanup thread
 cleanup_thread = threading.Thread(target=cleanup_files, daemon=True)
@@ -170,7 +528,8 @@ def home():
     <h2>Endpoints:</h2>
     <ul>
         <li><strong>POST /upload-cookies</strong> - Upload cookies.txt file</li>
-        <li><strong>GET /download?url=VIDEO_URL&quality=best&format=mp4</strong> - Download video</li>
+        <li><strong>GET /download?url=VIDEO_URL&quality=best&format=mp4</strong> - Stream video directly</li>
+        <li><strong>GET /download?url=VIDEO_URL&async=1</strong> - Save video on the server and return a download ID</li>
         <li><strong>GET /info?url=VIDEO_URL</strong> - Get video information</li>
         <li><strong>GET /file/DOWNLOAD_ID</strong> - Download file by ID</li>
         <li><strong>GET /status/DOWNLOAD_ID</strong> - Check download status</li>
@@ -178,7 +537,7 @@ def home():
     </ul>
     <h2>Usage:</h2>
     <p>1. First upload your cookies.txt file using /upload-cookies</p>
-    <p>2. Then use /download to get videos</p>
+    <p>2. Then use /download to get videos (add async=1 to get a download ID right away, poll /status and fetch from /file)</p>
     <p>Quality options: worst, best, or specific like 720p, 1080p</p>
     <p>Format options: mp4, webm, mkv, etc.</p>
     '''
@@ -229,41 +588,52 @@ def get_video_info():
     if not url:
         return jsonify({'error': 'URL parameter is required'}), 400
     
+    # Reject non-video URLs before spending a yt-dlp extraction on them
+    match = URL_PATTERN.match(url)
+    if not match:
+        return jsonify({'error': 'Invalid YouTube video URL'}), 400
+    
+    video_id = match.group(1)
+    with info_cache_lock:
+        video_info = info_cache.get(video_id)
+    if video_info is not None:
+        return jsonify(video_info)
+    
     try:
-        ydl_opts = get_yt_dlp_options()
-        ydl_opts['quiet'] = True
-        
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        with checkout() as ydl:
             info = ydl.extract_info(url, download=False)
-            
-            # Return relevant information
-            video_info = {
-                'title': info.get('title'),
-                'duration': info.get('duration'),
-                'uploader': info.get('uploader'),
-                'upload_date': info.get('upload_date'),
-                'view_count': info.get('view_count'),
-                'like_count': info.get('like_count'),
-                'description': info.get('description', '')[:500] + '...' if info.get('description') else '',
-                'thumbnail': info.get('thumbnail'),
-                'formats': [
-                    {
-                        'format_id': f.get('format_id'),
-                        'ext': f.get('ext'),
-                        'quality': f.get('format_note'),
-                        'filesize': f.get('filesize')
-                    } for f in info.get('formats', [])[:10]  # Limit to first 10 formats
-                ]
-            }
-            
-            return jsonify(video_info)
-            
+        
+        # Return relevant information
+        video_info = {
+            'title': info.get('title'),
+            'duration': info.get('duration'),
+            'uploader': info.get('uploader'),
+            'upload_date': info.get('upload_date'),
+            'view_count': info.get('view_count'),
+            'like_count': info.get('like_count'),
+            'description': truncate_description(info.get('description')),
+            'thumbnail': info.get('thumbnail'),
+            'formats': [
+                {
+                    'format_id': f.get('format_id'),
+                    'ext': f.get('ext'),
+                    'quality': f.get('format_note'),
+                    'filesize': f.get('filesize')
+                } for f in islice(info.get('formats') or (), 10)  # Limit to first 10 formats
+            ]
+        }
+        
+        with info_cache_lock:
+            info_cache[video_id] = video_info
+        
+        return jsonify(video_info)
+        
     except Exception as e:
         return jsonify({'error': f'Failed to get video info: {str(e)}'}), 500
 
 @app.route('/download')
 def download_video():
-    """Download video and return download URL"""
+    """Stream video to the client, or save it and return a download URL with async=1"""
     url = request.args.get('url')
     quality = request.args.get('quality', 'best')
     format_type = request.args.get('format', 'mp4')
@@ -271,93 +641,94 @@ def download_video():
     if not url:
         return jsonify({'error': 'URL parameter is required'}), 400
     
-    download_id = str(uuid.uuid4())
+    if not URL_PATTERN.match(url):
+        return jsonify({'error': 'Invalid YouTube video URL'}), 400
     
-    try:
-        # Store download info
-        downloads[download_id] = {
-            'status': 'downloading',
-            'timestamp': datetime.now(),
-            'url': url,
-            'filename': None,
-            'error': None
-        }
-        
-        # Get video info first
-        ydl_opts = get_yt_dlp_options(quality, format_type)
-        ydl_opts['quiet'] = True
-        
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            # Extract info to get title
-            info = ydl.extract_info(url, download=False)
-            title = info.get('title', 'video')
-            
-            # Sanitize filename
-            safe_title = "".join(c for c in title if c.isalnum() or c in (' ', '-', '_')).rstrip()
-            expected_filename = f"{safe_title}.{format_type}"
-            expected_path = os.path.join(DOWNLOAD_DIR, expected_filename)
-            
-            # Download the video
-            ydl.download([url])
-            
-            # Find the actual downloaded file
-            downloaded_file = None
-            for filename in os.listdir(DOWNLOAD_DIR):
-                filepath = os.path.join(DOWNLOAD_DIR, filename)
-                if os.path.isfile(filepath) and filename not in [f for f in downloads.values() if f.get('filename')]:
-                    # Check if this is a recently created file
-                    file_time = datetime.fromtimestamp(os.path.getctime(filepath))
-                    if datetime.now() - file_time < timedelta(seconds=30):
-                        downloaded_file = filename
-                        break
-            
-            if downloaded_file:
-                downloads[download_id]['status'] = 'completed'
-                downloads[download_id]['filename'] = downloaded_file
-                
-                return jsonify({
-                    'download_id': download_id,
-                    'status': 'completed',
-                    'filename': downloaded_file,
-                    'download_url': f'/file/{download_id}',
-                    'title': title
-                })
-            else:
-                downloads[download_id]['status'] = 'error'
-                downloads[download_id]['error'] = 'Downloaded file not found'
-                return jsonify({'error': 'Downloaded file not found'}), 500
-                
-    except Exception as e:
-        downloads[download_id]['status'] = 'error'
-        downloads[download_id]['error'] = str(e)
-        return jsonify({'error': f'Download failed: {str(e)}'}), 500
+    if request.args.get('async') != '1':
+        return stream_video(url, quality, format_type)
+    
+    # 72 random bits is ample for an ID that lives FILE_EXPIRY_TIME
+    download_id = secrets.token_urlsafe(9)
+    
+    # Store download info
+    record = {
+        'status': 'queued',
+        'url': url,
+        'progress': 0.0,
+        'title': None,
+        'filename': None,
+        'filesize': None,
+        'download_name': None,
+        'error': None
+    }
+    global active_downloads
+    with downloads_lock:
+        # Active records are never evicted, so cap them to keep memory and
+        # the executor's queue bounded
+        if active_downloads >= MAX_ACTIVE_DOWNLOADS:
+            return jsonify({'error': 'Too many downloads in progress, try again later'}), 503
+        active_downloads += 1
+        track_download(download_id, record)
+    
+    executor.submit(run_download, download_id, record, quality, format_type)
+    
+    return jsonify({
+        'download_id': download_id,
+        'status': 'queued',
+        'status_url': f'/status/{download_id}',
+        'download_url': f'/file/{download_id}'
+    }), 202
 
 @app.route('/file/<download_id>')
 def get_file(download_id):
     """Download file by download ID"""
-    if download_id not in downloads:
-        return jsonify({'error': 'Download ID not found'}), 404
+    with downloads_lock:
+        download_info = downloads.get(download_id)
+        if download_info is not None:
+            download_info = dict(download_info)
     
-    download_info = downloads[download_id]
+    if download_info is None:
+        return jsonify({'error': 'Download ID not found'}), 404
     
     if download_info['status'] != 'completed':
         return jsonify({'error': f'Download not completed. Status: {download_info["status"]}'}), 400
     
-    filename = download_info['filename']
+    # Never let a stored name reach outside DOWNLOAD_DIR
+    filename = os.path.basename(download_info['filename'])
     filepath = os.path.join(DOWNLOAD_DIR, filename)
     
     if not os.path.exists(filepath):
         return jsonify({'error': 'File not found'}), 404
     
-    return send_file(filepath, as_attachment=True, download_name=filename)
+    # The file is handed to the server's wsgi.file_wrapper, which gunicorn
+    # serves with sendfile(2); USE_X_SENDFILE offloads it to a proxy.
+    # conditional=True answers Range and If-* requests so clients can resume,
+    # and sends Accept-Ranges plus a Content-Length matching each (partial)
+    # response, so downloads are never chunked.
+    # Flask resolves a relative directory against the app root, not the cwd
+    # yt-dlp writes to, hence abspath.
+    response = send_from_directory(
+        os.path.abspath(DOWNLOAD_DIR),
+        filename,
+        conditional=True,
+        as_attachment=True,
+        download_name=download_info['download_name']
+    )
+    response.headers['Cache-Control'] = f'private, max-age={FILE_EXPIRY_TIME}'
+    return response
 
 @app.route('/status/<download_id>')
 def get_status(download_id):
     """Get download status"""
-    if download_id not in downloads:
+    with downloads_lock:
+        download_info = downloads.get(download_id)
+        if download_info is not None:
+            download_info = dict(download_info)
+    
+    if download_info is None:
         return jsonify({'error': 'Download ID not found'}), 404
     
-    return jsonify(downloads[download_id])
+    return jsonify(download_info)
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
@@ -0,0 +1,11 @@
+import os
+
+# Bind to the port provided by the platform
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+
+# gevent workers let /info and /status keep answering while yt-dlp is busy
+# on other requests. Download records live in process memory, so more than
+# one worker needs sticky routing for /status and /file to find them.
+worker_class = 'gevent'
+workers = int(os.environ.get('GUNICORN_WORKERS', 1))
+worker_connections = 100